@@ -1,261 +1,838 @@
-import os
-import shutil
-import sys
-import threading
-import time
-import hashlib
-from datetime import datetime
-from threading import Event
-from typing import Union, Optional
-
-
-class FolderNotFoundError(Exception):
-    """Exception raised when a folder is not found."""
-    pass
-
-
-def calculate_sha1(file_path: str) -> str:
-    """Calculate SHA-1 hash of a file."""
-    hash_sha1 = hashlib.sha1()
-    with open(file_path, "rb") as file:
-        for chunk in iter(lambda: file.read(4096), b""):
-            hash_sha1.update(chunk)
-    return hash_sha1.hexdigest()
-
-
-def get_log_file_path(log_dir: str) -> str:
-    """Get the path for the log file."""
-    return os.path.join(log_dir, "sync_logs.log")
-
-
-def log_message(log_file_path: str, message: str) -> None:
-    """Log a message to the log file and print it to the console."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {message}"
-    with open(log_file_path, "a") as file:
-        if message == "***":
-            file.write(message + "\n")
-        else:
-            file.write(log_entry + "\n")
-    print(log_entry)
-
-
-def check_input(source_dir: str, replica_dir: str, interval: str) -> None:
-    """Check the validity of input directories and interval."""
-    if not os.path.exists(source_dir) or not os.path.isdir(source_dir):
-        raise FolderNotFoundError(f"Source dir '{source_dir}' does not exist!")
-
-    if not os.path.exists(replica_dir) or not os.path.isdir(replica_dir):
-        raise FolderNotFoundError(f"Replica dir '{replica_dir}' does not exist!")
-
-    try:
-        int(interval)
-    except ValueError:
-        print("Interval must be an integer.")
-        sys.exit(1)
-
-
-def get_file_size(file_path: str) -> int:
-    """Return the size of a file in bytes."""
-    return os.path.getsize(file_path)
-
-
-def get_file_modification_date(file_path: str) -> str:
-    """Return the last modification date of a file."""
-    mod_timestamp = os.path.getmtime(file_path)
-    mod_date = datetime.fromtimestamp(mod_timestamp)
-    return mod_date.strftime("%Y-%m-%d %H:%M:%S")
-
-
-def log_error(log_file_path: str, error_type: Union[str, Exception],
-              source_file: Optional[str], replica_file: Optional[str], operation: str) -> None:
-    """Log an error message."""
-    if error_type == "PermissionError":
-        log_message(log_file_path, f"Permission denied: Could not {operation} "
-                                   f"file '{source_file}' to '{replica_file}'")
-    else:
-        log_message(log_file_path, f"OS error while {operation} file '{source_file}' "
-                                   f"to '{replica_file}': {str(error_type)}")
-
-
-def copy_or_update_file(source_file: str, replica_file: str, clean_log_path: str,
-                        log_file_path: str, changes: list, is_update: bool = False,
-                        file_name: str = None) -> None:
-    """Copy or update a file between source and replica."""
-    source_size = get_file_size(source_file)
-    source_mod_date = get_file_modification_date(source_file)
-
-    replica_size = None
-    replica_mod_date = None
-
-    if os.path.exists(replica_file):
-        replica_size = get_file_size(replica_file)
-        replica_mod_date = get_file_modification_date(replica_file)
-
-    try:
-        shutil.copy2(source_file, replica_file)
-        if is_update:
-            log_message(log_file_path,
-                        f"File '{file_name}' modified since last sync. "
-                        f"Updated file: {source_file} -> {clean_log_path}. "
-                        f"Size: {replica_size} -> {source_size} bytes. "
-                        f"Date: {replica_mod_date} -> {source_mod_date}")
-        else:
-            log_message(log_file_path, f"Copied new file: {source_file} -> {clean_log_path}")
-        changes[0] += 1
-    except PermissionError:
-        log_error(log_file_path, "PermissionError", source_file, replica_file, "copy/update")
-    except OSError as e:
-        log_error(log_file_path, e, source_file, replica_file, "copy/update")
-
-
-def create_folder(replica_path: str, log_file_path: str, changes: list) -> None:
-    """Create a folder in the replica directory."""
-    try:
-        os.makedirs(replica_path)
-        log_message(log_file_path, f"Created folder '{replica_path}'")
-        changes[1] += 1
-    except PermissionError:
-        log_error(log_file_path, "PermissionError", None, replica_path, "create")
-    except OSError as e:
-        log_error(log_file_path, e, None, replica_path, "create")
-
-
-def create_or_update_files_and_folders(source_dir: str, replica_dir: str, log_file_path: str, changes: list) -> None:
-    """Create or update files and folders in the replica directory."""
-    for root, dirs, files in os.walk(source_dir):
-        relative_path = os.path.relpath(root, source_dir)
-        replica_path = os.path.join(replica_dir, relative_path)
-
-        if not os.path.exists(replica_path):
-            create_folder(replica_path, log_file_path, changes)
-
-        for file_name in files:
-            source_file = os.path.join(root, file_name)
-            replica_file = os.path.join(replica_path, file_name)
-            clean_log_path = replica_file.replace(replica_dir + os.sep + ".", replica_dir)
-
-            if not os.path.exists(replica_file):
-                copy_or_update_file(source_file, replica_file, clean_log_path, log_file_path, changes)
-            else:
-                source_mtime = os.path.getmtime(source_file)
-                replica_mtime = os.path.getmtime(replica_file)
-
-                if source_mtime != replica_mtime or calculate_sha1(source_file) != calculate_sha1(replica_file):
-                    copy_or_update_file(source_file, replica_file, clean_log_path, log_file_path, changes,
-                                        is_update=True, file_name=file_name)
-
-
-def delete_file(replica_file: str, log_file_path: str, changes: list) -> None:
-    """Delete a file from the replica directory."""
-    try:
-        os.remove(replica_file)
-        log_message(log_file_path, f"Deleted file '{replica_file}'")
-        changes[0] += 1
-    except PermissionError:
-        log_error(log_file_path, "PermissionError", None, replica_file, "delete")
-    except OSError as e:
-        log_error(log_file_path, e, None, replica_file, "delete")
-
-
-def delete_folder(replica_subdir: str, log_file_path: str, changes: list) -> None:
-    """Delete a folder from the replica directory."""
-    try:
-        changes_in_dir = [0, 0]
-
-        for root, dirs, files in os.walk(replica_subdir):
-            changes_in_dir[0] += len(files)
-            changes_in_dir[1] += len(dirs)
-
-        changes[0] += changes_in_dir[0]
-        changes[1] += changes_in_dir[1]
-
-        shutil.rmtree(replica_subdir)
-        log_message(log_file_path,
-                    f"Deleted folder '{replica_subdir}' and {changes_in_dir[0]} files inside it, "
-                    f"including {changes_in_dir[1]} subfolders")
-        changes[1] += 1
-    except PermissionError:
-        log_error(log_file_path, "PermissionError", None, replica_subdir, "delete")
-    except OSError as e:
-        log_error(log_file_path, e, None, replica_subdir, "delete")
-
-
-def remove_deleted_files_and_folders(source_dir: str, replica_dir: str, log_file_path: str, changes: list) -> None:
-    """Remove deleted files and folders from the replica directory."""
-    for root, dirs, files in os.walk(replica_dir):
-        relative_path = os.path.relpath(root, replica_dir)
-        source_path = os.path.join(source_dir, relative_path)
-
-        for file_name in files:
-            replica_file = os.path.join(root, file_name)
-            source_file = os.path.join(source_path, file_name)
-
-            if not os.path.exists(source_file):
-                delete_file(replica_file, log_file_path, changes)
-
-        for dir_name in dirs:
-            replica_subdir = os.path.join(root, dir_name)
-            source_subdir = os.path.join(source_path, dir_name)
-
-            if not os.path.exists(source_subdir):
-                delete_folder(replica_subdir, log_file_path, changes)
-
-
-def sync_folders(source_dir: str, replica_dir: str, log_file_path: str, interval: int, stop_event: Event) -> None:
-    """Synchronize the replica folder with the source folder in a loop."""
-    while not stop_event.is_set():
-        start_time = time.time()
-
-        log_message(log_file_path, f"Start synchronization process '{source_dir}' -> '{replica_dir}'...")
-        changes = [0, 0]
-        create_or_update_files_and_folders(source_dir, replica_dir, log_file_path, changes)
-        remove_deleted_files_and_folders(source_dir, replica_dir, log_file_path, changes)
-
-        end_time = time.time()
-        time_taken = end_time - start_time
-
-        log_message(log_file_path,
-                    f"Synchronization completed: {changes[0]} files and {changes[1]} folders were changed "
-                    f"in {time_taken:.2f} seconds.")
-        log_message(log_file_path, "***")
-
-        if stop_event.wait(int(interval)):
-            break
-
-
-def main() -> None:
-    """Main function to periodically synchronize folders."""
-    args = sys.argv[1:]
-
-    try:
-        source_dir, replica_dir, interval = args
-    except ValueError:
-        print("Please input source dir path, replica dir path and interval for synchronization.")
-        sys.exit(1)
-
-    check_input(source_dir, replica_dir, interval)
-
-    log_file_path = get_log_file_path(os.getcwd())
-    log_message(
-        log_file_path, f"Run synchronization algorithm with parameters '{source_dir}, {replica_dir}, {interval}'\n***"
-    )
-
-    stop_event = Event()
-
-    sync_thread = threading.Thread(
-        target=sync_folders, args=(source_dir, replica_dir, log_file_path, interval, stop_event)
-    )
-    sync_thread.start()
-
-    try:
-        while sync_thread.is_alive():
-            sync_thread.join(1)
-    except KeyboardInterrupt:
-        stop_event.set()
-        sync_thread.join()
-        log_message(log_file_path, "Synchronization process stopped.")
-
-
-if __name__ == "__main__":
-    main()
+import ctypes
+import json
+import mmap
+import os
+import queue
+import shutil
+import signal
+import stat
+import sys
+import threading
+import time
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from threading import Event
+from typing import Union, Optional
+
+
+class FolderNotFoundError(Exception):
+    """Exception raised when a folder is not found."""
+    pass
+
+
+FastStat = namedtuple("FastStat", ["st_size", "st_mtime", "st_mtime_ns", "st_dev", "st_ino", "is_dir"])
+
+_AT_FDCWD = -100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_WANTED = 0x1 | 0x100 | 0x200 | 0x40  # STATX_TYPE | STATX_INO | STATX_SIZE | STATX_MTIME
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_int64),
+                ("tv_nsec", ctypes.c_uint32),
+                ("_reserved", ctypes.c_int32)]
+
+
+class _Statx(ctypes.Structure):
+    _fields_ = [("stx_mask", ctypes.c_uint32),
+                ("stx_blksize", ctypes.c_uint32),
+                ("stx_attributes", ctypes.c_uint64),
+                ("stx_nlink", ctypes.c_uint32),
+                ("stx_uid", ctypes.c_uint32),
+                ("stx_gid", ctypes.c_uint32),
+                ("stx_mode", ctypes.c_uint16),
+                ("_spare0", ctypes.c_uint16),
+                ("stx_ino", ctypes.c_uint64),
+                ("stx_size", ctypes.c_uint64),
+                ("stx_blocks", ctypes.c_uint64),
+                ("stx_attributes_mask", ctypes.c_uint64),
+                ("stx_atime", _StatxTimestamp),
+                ("stx_btime", _StatxTimestamp),
+                ("stx_ctime", _StatxTimestamp),
+                ("stx_mtime", _StatxTimestamp),
+                ("stx_rdev_major", ctypes.c_uint32),
+                ("stx_rdev_minor", ctypes.c_uint32),
+                ("stx_dev_major", ctypes.c_uint32),
+                ("stx_dev_minor", ctypes.c_uint32),
+                ("_spare2", ctypes.c_uint64 * 14)]
+
+
+def _load_statx():
+    """Probe for a usable statx in libc; return None where unavailable."""
+    if sys.platform != "linux":
+        return None
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        statx = libc.statx
+    except (OSError, AttributeError):
+        return None
+
+    statx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int,
+                      ctypes.c_uint, ctypes.POINTER(_Statx)]
+    statx.restype = ctypes.c_int
+
+    buffer = _Statx()
+    if statx(_AT_FDCWD, b".", _AT_STATX_DONT_SYNC, _STATX_WANTED, ctypes.byref(buffer)) != 0:
+        return None  # kernel < 4.11 answers ENOSYS
+
+    return statx
+
+
+_statx = _load_statx()
+
+
+def fast_stat(path: str) -> FastStat:
+    """Return a FastStat for a path with one cheap syscall.
+
+    On Linux this calls statx with AT_STATX_DONT_SYNC, requesting only
+    the type, inode, size and mtime fields FastStat carries, so networked
+    filesystems may answer from cache instead of flushing to the server
+    first. Elsewhere it falls back to os.stat. Missing paths raise
+    FileNotFoundError, as with os.stat.
+    """
+    if _statx is not None:
+        buffer = _Statx()
+        if _statx(_AT_FDCWD, os.fsencode(path), _AT_STATX_DONT_SYNC,
+                  _STATX_WANTED, ctypes.byref(buffer)) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        mtime_ns = buffer.stx_mtime.tv_sec * 10 ** 9 + buffer.stx_mtime.tv_nsec
+        return FastStat(buffer.stx_size,
+                        buffer.stx_mtime.tv_sec + buffer.stx_mtime.tv_nsec * 1e-9,
+                        mtime_ns,
+                        os.makedev(buffer.stx_dev_major, buffer.stx_dev_minor),
+                        buffer.stx_ino,
+                        stat.S_ISDIR(buffer.stx_mode))
+
+    result = os.stat(path)
+    return FastStat(result.st_size, result.st_mtime, result.st_mtime_ns,
+                    result.st_dev, result.st_ino, stat.S_ISDIR(result.st_mode))
+
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import sync_core  # compiled scan loop, see setup.py
+except ImportError:
+    sync_core = None
+
+
+def _make_hasher():
+    """Create the fastest available hasher for change detection.
+
+    The digests are only compared for equality, never stored or exposed,
+    so a cryptographic hash is not required. Prefer xxh3 (fastest), then
+    BLAKE3 when either optional package is installed, and fall back to
+    the stdlib BLAKE2b, which still outruns OpenSSL's SHA-1 in software.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    if blake3 is not None:
+        return blake3.blake3()
+    return hashlib.blake2b()
+
+
+MMAP_WINDOW = 16 * 1024 * 1024
+HASH_BUFSIZE = 1 << 20
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+SCAN_WORKERS = os.cpu_count() or 1
+
+_changes_lock = threading.Lock()
+
+
+class HashCache:
+    """Digest cache keyed on (dev, ino, size, mtime_ns) that tracks use.
+
+    Every key looked up or inserted since load is remembered, so that
+    save_hash_cache can evict entries no live file references anymore.
+    Without eviction each content change would orphan the old key and
+    the persisted cache would grow without bound across runs.
+    """
+
+    def __init__(self, entries: dict = None):
+        self.entries = entries if entries is not None else {}
+        self.used = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __setitem__(self, key, digest):
+        self.entries[key] = digest
+        self.used.add(key)
+
+    def get(self, key):
+        digest = self.entries.get(key)
+        if digest is not None:
+            self.used.add(key)
+        return digest
+
+    def prune(self) -> None:
+        """Drop entries whose keys were never referenced this run."""
+        self.entries = {key: self.entries[key] for key in self.used if key in self.entries}
+
+
+def calculate_digest(file_path: str, file_stat=None, cache: HashCache = None) -> str:
+    """Calculate the change-detection digest of a file.
+
+    The file is memory-mapped and fed to the hasher in 16 MiB windows, so
+    the whole read loop runs in C instead of one Python call per 4 KiB
+    chunk, while large files never hold the GIL for too long at once.
+    Files that cannot be mapped are read in 1 MiB buffers instead.
+
+    When a stat result and cache are given, the digest is remembered under
+    (dev, ino, size, mtime_ns), so a file is only ever hashed once until
+    it actually changes, even across sync cycles and runs.
+    """
+    cache_key = None
+    if cache is not None and file_stat is not None:
+        cache_key = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        digest = cache.get(cache_key)
+        if digest is not None:
+            return digest
+
+    hasher = _make_hasher()
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return hasher.hexdigest()
+        try:
+            with mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                for offset in range(0, size, MMAP_WINDOW):
+                    hasher.update(view[offset:offset + MMAP_WINDOW])
+                view.release()
+        except (OSError, ValueError):
+            for chunk in iter(lambda: file.read(HASH_BUFSIZE), b""):
+                hasher.update(chunk)
+
+    digest = hasher.hexdigest()
+    if cache_key is not None:
+        cache[cache_key] = digest
+    return digest
+
+
+def get_hash_cache_path(log_dir: str) -> str:
+    """Get the path for the persistent digest cache."""
+    return os.path.join(log_dir, ".sync_hash_cache.json")
+
+
+def load_hash_cache(cache_path: str) -> HashCache:
+    """Load the digest cache saved by a previous run, if any."""
+    try:
+        with open(cache_path) as file:
+            raw = json.load(file)
+    except (OSError, ValueError):
+        return HashCache()
+
+    if not isinstance(raw, dict):
+        return HashCache()
+
+    entries = {}
+    for key, digest in raw.items():
+        try:
+            dev, ino, size, mtime_ns = (int(part) for part in key.split(":"))
+        except ValueError:
+            continue
+        entries[(dev, ino, size, mtime_ns)] = digest
+    return HashCache(entries)
+
+
+def save_hash_cache(cache_path: str, cache: HashCache) -> None:
+    """Persist the referenced part of the digest cache for the next run."""
+    cache.prune()
+    raw = {":".join(str(part) for part in key): digest for key, digest in cache.entries.items()}
+    try:
+        with open(cache_path, "w") as file:
+            json.dump(raw, file)
+    except OSError:
+        pass
+
+
+def get_log_file_path(log_dir: str) -> str:
+    """Get the path for the log file."""
+    return os.path.join(log_dir, "sync_logs.log")
+
+
+_log_files = {}
+_log_files_lock = threading.Lock()
+
+
+def _get_log_file(log_file_path: str):
+    """Return a long-lived append handle for the log file.
+
+    Opening the log once avoids an open+close syscall pair per message;
+    the handle is flushed once per sync cycle instead of on every line.
+    """
+    with _log_files_lock:
+        file = _log_files.get(log_file_path)
+        if file is None:
+            file = open(log_file_path, "a")
+            _log_files[log_file_path] = file
+        return file
+
+
+def flush_logs() -> None:
+    """Flush all open log file handles to disk."""
+    with _log_files_lock:
+        for file in _log_files.values():
+            file.flush()
+
+
+def log_message(log_file_path: str, message: str) -> None:
+    """Log a message to the log file and print it to the console."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_entry = f"[{timestamp}] {message}"
+    file = _get_log_file(log_file_path)
+    if message == "***":
+        file.write(message + "\n")
+    else:
+        file.write(log_entry + "\n")
+    print(log_entry)
+
+
+class LogBuffer:
+    """Collect log lines during a sync cycle for one batched write.
+
+    Messages are timestamped as they arrive but reach the log file and
+    the console as a single joined write each when flush is called, so
+    file operations never stall on disk or TTY latency mid-cycle. This
+    replaces the per-message writes a cycle used to make.
+    """
+
+    def __init__(self):
+        self.file_lines = []
+        self.console_lines = []
+
+    def log(self, message: str) -> None:
+        """Buffer a message for the next flush."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_entry = f"[{timestamp}] {message}"
+        self.file_lines.append((message if message == "***" else log_entry) + "\n")
+        self.console_lines.append(log_entry + "\n")
+
+    def flush(self, log_file_path: str) -> None:
+        """Write all buffered lines with one call per destination."""
+        if not self.file_lines:
+            return
+        _get_log_file(log_file_path).write("".join(self.file_lines))
+        sys.stdout.writelines(self.console_lines)
+        self.file_lines = []
+        self.console_lines = []
+
+
+def check_input(source_dir: str, replica_dir: str, interval: str) -> None:
+    """Check the validity of input directories and interval."""
+    if not os.path.exists(source_dir) or not os.path.isdir(source_dir):
+        raise FolderNotFoundError(f"Source dir '{source_dir}' does not exist!")
+
+    if not os.path.exists(replica_dir) or not os.path.isdir(replica_dir):
+        raise FolderNotFoundError(f"Replica dir '{replica_dir}' does not exist!")
+
+    try:
+        int(interval)
+    except ValueError:
+        print("Interval must be an integer.")
+        sys.exit(1)
+
+
+def format_modification_date(mod_timestamp: float) -> str:
+    """Format a modification timestamp for log output."""
+    mod_date = datetime.fromtimestamp(mod_timestamp)
+    return mod_date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def log_error(log_buffer: "LogBuffer", error_type: Union[str, Exception],
+              source_file: Optional[str], replica_file: Optional[str], operation: str) -> None:
+    """Log an error message."""
+    if error_type == "PermissionError":
+        log_buffer.log(f"Permission denied: Could not {operation} "
+                       f"file '{source_file}' to '{replica_file}'")
+    else:
+        log_buffer.log(f"OS error while {operation} file '{source_file}' "
+                       f"to '{replica_file}': {str(error_type)}")
+
+
+def _copy_file(source_file: str, replica_file: str) -> None:
+    """Copy a file, preferring the in-kernel copy_file_range path.
+
+    copy_file_range never lifts the data into userspace and can reflink
+    on CoW filesystems (Btrfs/XFS), making same-volume copies of large
+    files near-instant. When the syscall is missing or the filesystem
+    refuses it, fall back to shutil.copy2 (which itself uses sendfile on
+    Linux and fcopyfile on macOS). Metadata is copied afterwards so the
+    next cycle's mtime check sees the source mtime.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copy2(source_file, replica_file)
+        return
+
+    try:
+        with open(source_file, "rb") as src, open(replica_file, "wb") as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except OSError:
+        shutil.copy2(source_file, replica_file)
+        return
+
+    shutil.copystat(source_file, replica_file)
+
+
+def copy_or_update_file(source_file: str, replica_file: str,
+                        log_buffer: "LogBuffer", changes: list, is_update: bool = False,
+                        file_name: str = None, source_stat: os.stat_result = None,
+                        replica_stat: os.stat_result = None) -> None:
+    """Copy or update a file between source and replica.
+
+    Callers that already hold stat results pass them in so the file is not
+    stat'ed a second time just for the log line.
+    """
+    if source_stat is None:
+        source_stat = os.stat(source_file)
+
+    source_size = source_stat.st_size
+    source_mod_date = format_modification_date(source_stat.st_mtime)
+
+    replica_size = None
+    replica_mod_date = None
+
+    if replica_stat is not None:
+        replica_size = replica_stat.st_size
+        replica_mod_date = format_modification_date(replica_stat.st_mtime)
+
+    try:
+        _copy_file(source_file, replica_file)
+        # Stamp the replica mtime from the stat the caller already holds, at
+        # nanosecond precision. copystat usually covers this, but on
+        # filesystems with coarser timestamp resolution (FAT/SMB) a drifted
+        # mtime would force a spurious re-copy on every following cycle.
+        os.utime(replica_file, ns=(time.time_ns(), source_stat.st_mtime_ns))
+        if is_update:
+            log_buffer.log(f"File '{file_name}' modified since last sync. "
+                           f"Updated file: {source_file} -> {replica_file}. "
+                           f"Size: {replica_size} -> {source_size} bytes. "
+                           f"Date: {replica_mod_date} -> {source_mod_date}")
+        else:
+            log_buffer.log(f"Copied new file: {source_file} -> {replica_file}")
+        with _changes_lock:
+            changes[0] += 1
+    except PermissionError:
+        log_error(log_buffer, "PermissionError", source_file, replica_file, "copy/update")
+    except OSError as e:
+        log_error(log_buffer, e, source_file, replica_file, "copy/update")
+
+
+def create_folder(replica_path: str, log_buffer: "LogBuffer", changes: list) -> None:
+    """Create a folder in the replica directory."""
+    try:
+        os.makedirs(replica_path)
+        log_buffer.log(f"Created folder '{replica_path}'")
+        with _changes_lock:
+            changes[1] += 1
+    except PermissionError:
+        log_error(log_buffer, "PermissionError", None, replica_path, "create")
+    except OSError as e:
+        log_error(log_buffer, e, None, replica_path, "create")
+
+
+def _digest_pair(source_file: str, replica_file: str, source_stat, replica_stat,
+                 hash_cache: HashCache) -> tuple:
+    """Calculate the digests of a source/replica file pair."""
+    return (calculate_digest(source_file, source_stat, hash_cache),
+            calculate_digest(replica_file, replica_stat, hash_cache))
+
+
+def _walk_parallel(root, handle_dir) -> None:
+    """Walk a directory tree with a pool of work-stealing threads.
+
+    handle_dir(item) processes one directory item — a path, or whatever
+    tuple the caller seeds the queue with — and returns the list of items
+    to descend into. Directories that disappear or cannot be read are
+    skipped, matching os.walk's default error handling.
+    """
+    dir_queue = queue.Queue()
+    dir_queue.put(root)
+
+    def worker() -> None:
+        while True:
+            directory = dir_queue.get()
+            if directory is None:
+                dir_queue.task_done()
+                break
+            try:
+                for subdir in handle_dir(directory):
+                    dir_queue.put(subdir)
+            except OSError:
+                pass
+            finally:
+                dir_queue.task_done()
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(SCAN_WORKERS)]
+    for thread in workers:
+        thread.start()
+
+    dir_queue.join()
+    for _ in workers:
+        dir_queue.put(None)
+    for thread in workers:
+        thread.join()
+
+
+def scan_tree(root_dir: str) -> dict:
+    """Scan a tree once, mapping relative paths to their FastStat.
+
+    Directories map to None; files map to their stat. Symlinked
+    directories are listed but never descended and broken symlinks are
+    skipped, matching the old os.walk-based behavior.
+
+    Since scan_trees_merged took over the shared portion of the walk,
+    this is only called (via _record_subtree) for one-sided subtrees —
+    folders present in just one of the two trees — and the optional
+    compiled sync_core loop dispatched here covers only that work too.
+    """
+    if sync_core is not None:
+        return sync_core.scan_tree(root_dir)
+
+    entries = {}
+
+    def handle_dir(directory: str) -> list:
+        relative_dir = "" if directory == root_dir else os.path.relpath(directory, root_dir)
+
+        subdirs = []
+        for entry in os.scandir(directory):
+            relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                entries[relative_path] = None
+                subdirs.append(entry.path)
+                continue
+
+            try:
+                entry_stat = fast_stat(entry.path)
+            except OSError:
+                continue
+            if entry_stat.is_dir:
+                entries[relative_path] = None  # symlink to a folder: listed, not descended
+            else:
+                entries[relative_path] = entry_stat
+        return subdirs
+
+    _walk_parallel(root_dir, handle_dir)
+    return entries
+
+
+_MISSING = object()
+_SYMLINK_DIR = object()
+
+
+def _list_dir(directory: str) -> dict:
+    """Map a directory's entry names to their FastStat.
+
+    Real folders map to None, symlinks to folders map to _SYMLINK_DIR so
+    the merged walk can list them without ever descending through the
+    link, and files map to their stat.
+    """
+    entries = {}
+    for entry in os.scandir(directory):
+        if entry.is_dir(follow_symlinks=False):
+            entries[entry.name] = None
+        else:
+            try:
+                entry_stat = fast_stat(entry.path)
+            except OSError:
+                continue
+            entries[entry.name] = _SYMLINK_DIR if entry_stat.is_dir else entry_stat
+    return entries
+
+
+def _record_subtree(directory: str, relative_dir: str, tree: dict) -> None:
+    """Record every entry below a single-sided directory into a tree dict."""
+    for sub_path, entry_stat in scan_tree(directory).items():
+        tree[os.path.join(relative_dir, sub_path)] = entry_stat
+
+
+def scan_trees_merged(source_dir: str, replica_dir: str) -> tuple:
+    """Scan source and replica in lockstep, dropping entries that match.
+
+    One pass over both trees replaces the two separate scans. At each
+    directory level the entries are compared in place: files identical by
+    the quick check (same size and mtime_ns under the same relative path)
+    and folders present on both sides are omitted from the returned
+    mappings, since identical entries can never produce an action. The
+    diff sets therefore scale with the amount of change, not the tree
+    size. Folders that exist only in the source are enumerated in full
+    (their contents must be copied); folders only in the replica are
+    recorded without descending, because delete_folder removes them
+    wholesale anyway. Symlinked folders are listed on either side but
+    never descended through. Descent into folders present on both sides is never
+    skipped: a directory's own mtime does not change when a file deep
+    inside it is edited, so a summary-based prune would miss those edits.
+    """
+    source_tree = {}
+    replica_tree = {}
+
+    def handle_dir(roots: tuple) -> list:
+        source_root, replica_root, relative_dir = roots
+        source_entries = _list_dir(source_root)
+        replica_entries = _list_dir(replica_root)
+
+        subdir_pairs = []
+        for name, source_stat in source_entries.items():
+            relative_path = os.path.join(relative_dir, name) if relative_dir else name
+            replica_stat = replica_entries.get(name, _MISSING)
+            source_is_dir = source_stat is None or source_stat is _SYMLINK_DIR
+            replica_is_dir = replica_stat is None or replica_stat is _SYMLINK_DIR
+
+            if replica_stat is _MISSING:
+                source_tree[relative_path] = None if source_is_dir else source_stat
+                if source_stat is None:
+                    _record_subtree(os.path.join(source_root, name), relative_path, source_tree)
+                continue
+
+            if source_is_dir and replica_is_dir:
+                # A folder on both sides needs no action; descend only when
+                # neither side is a symlink.
+                if source_stat is None and replica_stat is None:
+                    subdir_pairs.append((os.path.join(source_root, name),
+                                         os.path.join(replica_root, name), relative_path))
+                continue
+
+            if not source_is_dir and not replica_is_dir:
+                if (source_stat.st_size == replica_stat.st_size
+                        and source_stat.st_mtime_ns == replica_stat.st_mtime_ns):
+                    continue
+                source_tree[relative_path] = source_stat
+                replica_tree[relative_path] = replica_stat
+                continue
+
+            # File on one side, folder on the other: record both so the
+            # action passes surface the conflict the same way as before.
+            source_tree[relative_path] = None if source_is_dir else source_stat
+            replica_tree[relative_path] = None if replica_is_dir else replica_stat
+            if source_stat is None:
+                _record_subtree(os.path.join(source_root, name), relative_path, source_tree)
+
+        for name, replica_stat in replica_entries.items():
+            if name in source_entries:
+                continue
+            relative_path = os.path.join(relative_dir, name) if relative_dir else name
+            replica_tree[relative_path] = None if replica_stat is _SYMLINK_DIR else replica_stat
+
+        return subdir_pairs
+
+    _walk_parallel((source_dir, replica_dir, ""), handle_dir)
+    return source_tree, replica_tree
+
+
+def create_or_update_files_and_folders(source_dir: str, replica_dir: str, log_buffer: "LogBuffer", changes: list,
+                                       source_tree: dict, replica_tree: dict,
+                                       hash_cache: HashCache = None, check_content: bool = False) -> None:
+    """Create or update files and folders in the replica directory.
+
+    By default files are compared with rsync's quick check: equal size
+    and mtime means unchanged, anything else is copied, and contents are
+    never read. check_content=True (the --checksum flag) restores the
+    digest tie-break for mtime-only differences, for setups where mtimes
+    cannot be trusted.
+    """
+    added = source_tree.keys() - replica_tree.keys()
+    common = source_tree.keys() & replica_tree.keys()
+    candidates = []
+
+    for relative_path in sorted(added):
+        source_stat = source_tree[relative_path]
+        replica_path = os.path.join(replica_dir, relative_path)
+
+        if source_stat is None:
+            create_folder(replica_path, log_buffer, changes)
+        else:
+            source_file = os.path.join(source_dir, relative_path)
+            copy_or_update_file(source_file, replica_path, log_buffer, changes,
+                                source_stat=source_stat)
+
+    for relative_path in sorted(common):
+        source_stat = source_tree[relative_path]
+        if source_stat is None:
+            continue
+
+        replica_stat = replica_tree[relative_path]
+        source_file = os.path.join(source_dir, relative_path)
+        replica_file = os.path.join(replica_dir, relative_path)
+        file_name = os.path.basename(relative_path)
+
+        if replica_stat is None or source_stat.st_size != replica_stat.st_size:
+            copy_or_update_file(source_file, replica_file, log_buffer, changes,
+                                is_update=True, file_name=file_name,
+                                source_stat=source_stat, replica_stat=replica_stat)
+        elif source_stat.st_mtime_ns != replica_stat.st_mtime_ns:
+            if check_content:
+                candidates.append((source_file, replica_file, file_name,
+                                   source_stat, replica_stat))
+            else:
+                copy_or_update_file(source_file, replica_file, log_buffer, changes,
+                                    is_update=True, file_name=file_name,
+                                    source_stat=source_stat, replica_stat=replica_stat)
+
+    if not candidates:
+        return
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        futures = {
+            executor.submit(_digest_pair, candidate[0], candidate[1],
+                            candidate[3], candidate[4], hash_cache): candidate
+            for candidate in candidates
+        }
+        for future in as_completed(futures):
+            source_file, replica_file, file_name, source_stat, replica_stat = futures[future]
+            source_digest, replica_digest = future.result()
+
+            if source_digest != replica_digest:
+                copy_or_update_file(source_file, replica_file, log_buffer, changes,
+                                    is_update=True, file_name=file_name,
+                                    source_stat=source_stat, replica_stat=replica_stat)
+
+
+def delete_file(replica_file: str, log_buffer: "LogBuffer", changes: list) -> None:
+    """Delete a file from the replica directory."""
+    try:
+        os.remove(replica_file)
+        log_buffer.log(f"Deleted file '{replica_file}'")
+        with _changes_lock:
+            changes[0] += 1
+    except PermissionError:
+        log_error(log_buffer, "PermissionError", None, replica_file, "delete")
+    except OSError as e:
+        log_error(log_buffer, e, None, replica_file, "delete")
+
+
+def delete_folder(replica_subdir: str, log_buffer: "LogBuffer", changes: list) -> None:
+    """Delete a folder from the replica directory."""
+    try:
+        changes_in_dir = [0, 0]
+
+        for root, dirs, files in os.walk(replica_subdir):
+            changes_in_dir[0] += len(files)
+            changes_in_dir[1] += len(dirs)
+
+        with _changes_lock:
+            changes[0] += changes_in_dir[0]
+            changes[1] += changes_in_dir[1]
+
+        shutil.rmtree(replica_subdir)
+        log_buffer.log(f"Deleted folder '{replica_subdir}' and {changes_in_dir[0]} files inside it, "
+                       f"including {changes_in_dir[1]} subfolders")
+        with _changes_lock:
+            changes[1] += 1
+    except PermissionError:
+        log_error(log_buffer, "PermissionError", None, replica_subdir, "delete")
+    except OSError as e:
+        log_error(log_buffer, e, None, replica_subdir, "delete")
+
+
+def remove_deleted_files_and_folders(source_dir: str, replica_dir: str, log_buffer: "LogBuffer", changes: list,
+                                     source_tree: dict, replica_tree: dict) -> None:
+    """Remove deleted files and folders from the replica directory."""
+    removed = replica_tree.keys() - source_tree.keys()
+    deleted_dirs = set()
+
+    for relative_path in sorted(removed):
+        is_dir = replica_tree[relative_path] is None
+
+        if os.path.dirname(relative_path) in deleted_dirs:
+            if is_dir:
+                deleted_dirs.add(relative_path)
+            continue
+
+        replica_path = os.path.join(replica_dir, relative_path)
+        if is_dir:
+            delete_folder(replica_path, log_buffer, changes)
+            deleted_dirs.add(relative_path)
+        else:
+            delete_file(replica_path, log_buffer, changes)
+
+
+def sync_folders(source_dir: str, replica_dir: str, log_file_path: str, interval: int, stop_event: Event,
+                 hash_cache: HashCache = None, hash_cache_path: str = None, check_content: bool = False) -> None:
+    """Synchronize the replica folder with the source folder in a loop."""
+    if hash_cache is None:
+        hash_cache = HashCache()
+
+    while not stop_event.is_set():
+        start_time = time.time()
+        cache_size = len(hash_cache)
+
+        log_message(log_file_path, f"Start synchronization process '{source_dir}' -> '{replica_dir}'...")
+        changes = [0, 0]
+        log_buffer = LogBuffer()
+        source_tree, replica_tree = scan_trees_merged(source_dir, replica_dir)
+        create_or_update_files_and_folders(source_dir, replica_dir, log_buffer, changes,
+                                           source_tree, replica_tree, hash_cache, check_content)
+        remove_deleted_files_and_folders(source_dir, replica_dir, log_buffer, changes,
+                                         source_tree, replica_tree)
+
+        if hash_cache_path is not None and len(hash_cache) != cache_size:
+            save_hash_cache(hash_cache_path, hash_cache)
+
+        end_time = time.time()
+        time_taken = end_time - start_time
+
+        log_buffer.log(f"Synchronization completed: {changes[0]} files and {changes[1]} folders were changed "
+                       f"in {time_taken:.2f} seconds.")
+        log_buffer.log("***")
+        log_buffer.flush(log_file_path)
+        flush_logs()
+
+        if stop_event.wait(interval):
+            break
+
+
+def main() -> None:
+    """Main function to periodically synchronize folders."""
+    args = sys.argv[1:]
+
+    check_content = "--checksum" in args
+    if check_content:
+        args.remove("--checksum")
+
+    try:
+        source_dir, replica_dir, interval = args
+    except ValueError:
+        print("Please input source dir path, replica dir path and interval for synchronization.")
+        sys.exit(1)
+
+    check_input(source_dir, replica_dir, interval)
+    interval = int(interval)
+
+    log_file_path = get_log_file_path(os.getcwd())
+    log_message(
+        log_file_path, f"Run synchronization algorithm with parameters '{source_dir}, {replica_dir}, {interval}'\n***"
+    )
+
+    hash_cache_path = get_hash_cache_path(os.getcwd())
+    hash_cache = load_hash_cache(hash_cache_path)
+
+    stop_event = Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    sync_folders(source_dir, replica_dir, log_file_path, interval, stop_event,
+                 hash_cache, hash_cache_path, check_content)
+
+    log_message(log_file_path, "Synchronization process stopped.")
+    flush_logs()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""Build the optional sync_core extension: python setup.py build_ext --inplace"""
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    raise SystemExit("Cython is required to build sync_core: pip install cython")
+
+setup(name="sync_core", ext_modules=cythonize("sync_core.pyx"))